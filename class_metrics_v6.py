@@ -1,10 +1,18 @@
 import os
 import ast
+import re
 import subprocess
-import csv
-from collections import defaultdict
+import hashlib
+import pickle
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 import sys
-import networkx as nx
+
+try:
+    import numpy as np
+except ImportError:  # numpy and numba are optional: without them the pure-Python path is used
+    np = None
 
 # The script computes the following metrics:
 # 1. LOC (lines in class body)
@@ -14,7 +22,11 @@ import networkx as nx
 # It uses git log -L to track the history of lines that belong to a specific class definition.
 # Each time Git detects a change in the lines belonging to that class (e.g., a method added, modified, or removed),
 # it counts as one "change".
-# The output.count("commit") counts how many commits affected that class's code block.
+# Every commit that adds or removes lines in the class's git -L range (from the class header to the next
+# top-level definition) counts once.
+# Only the "commit <sha>" header lines of the log are counted. Earlier versions counted every occurrence
+# of the word "commit" in the log output, commit messages and code lines (e.g. self.commit()) included,
+# so their "changes" (and therefore NLC) can be higher than this version's for the same history.
 # 4. Lines added/deleted
 # 5. Number of unique authors
 # 6. File path where the class is saved
@@ -46,72 +58,217 @@ import networkx as nx
 # 12 Fan out: the number of other modules, classes, or methods that a given class or method calls or depends on.
 #################################
 
+# Directories that never hold the project's own classes; not descended into at all.
+SKIP_DIRS = {'.git', '.venv', 'node_modules', '__pycache__', '.tox'}
+# Packaging output, only skipped at the top of the repo: deeper down these can be real packages.
+SKIP_TOP_LEVEL_DIRS = {'build', 'dist'}
+
 def get_py_files(repo_path):
+    # scandir entries carry their file type from the directory read, so no extra stat per entry
     py_files = []
-    for root, _, files in os.walk(repo_path):
-        for file in files:
-            if file.endswith('.py'):
-                py_files.append(os.path.join(root, file))
+    stack = [repo_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:  # unreadable directory: skip it, as os.walk did
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in SKIP_DIRS:
+                        continue
+                    if directory == repo_path and entry.name in SKIP_TOP_LEVEL_DIRS:
+                        continue
+                    subdirs.append(entry.path)
+                elif entry.name.endswith('.py'):
+                    py_files.append(entry.path)
+        # reversed, so the stack pops subdirectories in os.walk's top-down order
+        stack.extend(reversed(subdirs))
     return py_files
 
+class _ClassScan:
+    # Single traversal of a class collecting both the self.<field> accesses of each
+    # method (for LCOM/TCC) and the names the class refers to (for CBO).
+    # One instance is reused for every class of a file; scan() resets the state.
+    def __init__(self):
+        self.class_name = None
+        self.attributes = defaultdict(set)
+        self.imported_classes = set()
+
+    def scan(self, class_node):
+        # Driven from the class skeleton: bases, keywords, decorators and class-level
+        # statements are only scanned for names, the methods also for self.<field>.
+        # Iterative like ast.walk, with the enclosing method kept next to each node, so
+        # deeply nested expressions (e.g. long "a" + "b" + ... chains) cannot exhaust the stack.
+        self.class_name = class_node.name
+        self.attributes = attributes = defaultdict(set)
+        self.imported_classes = imported_classes = set()
+        stack = [(child, child.name if isinstance(child, ast.FunctionDef) else None)
+                 for child in ast.iter_child_nodes(class_node)]
+        while stack:
+            node, method = stack.pop()
+            if isinstance(node, ast.Name):
+                if node.id != self.class_name:
+                    imported_classes.add(node.id)
+                continue
+            if (isinstance(node, ast.Attribute) and method is not None
+                    and isinstance(node.value, ast.Name) and node.value.id == "self"):
+                attributes[method].add(node.attr)
+            stack.extend((child, method) for child in ast.iter_child_nodes(node))
+
+MATRIX_MIN_METHODS = 9  # below this building numpy arrays costs more than it saves
+JIT_MIN_METHODS = 32  # below this the numba call and mask building cost more than they save
+
+def _count_connected_masks(masks):
+    # masks[i] is the field bitset of method i, split into 64-bit lanes
+    n, lanes = masks.shape
+    connected = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            for k in range(lanes):
+                if masks[i, k] & masks[j, k]:
+                    connected += 1
+                    break
+    return connected
+
+_masks_kernel = None  # numba-compiled _count_connected_masks, False when numba is missing
+
+def _connected_masks_kernel():
+    # numba is slow to import, so it is only loaded, once per process, when a class is
+    # large enough for the kernel; most runs never get there.
+    global _masks_kernel
+    if _masks_kernel is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _masks_kernel = False
+        else:
+            _masks_kernel = njit(cache=True)(_count_connected_masks)
+    return _masks_kernel
+
+def _field_index(field_sets):
+    field_index = {}
+    for fields in field_sets:
+        for field in fields:
+            field_index.setdefault(field, len(field_index))
+    return field_index
+
+def count_connected_pairs(field_sets):
+    # Number of method pairs sharing at least one field (directly connected pairs).
+    n = len(field_sets)
+    kernel = _connected_masks_kernel() if np is not None and n >= JIT_MIN_METHODS else None
+    if kernel:
+        field_bits = _field_index(field_sets)
+        lanes = (len(field_bits) + 63) // 64
+        masks = np.zeros((n, lanes), dtype=np.uint64)
+        for i, fields in enumerate(field_sets):
+            mask = 0
+            for field in fields:
+                mask |= 1 << field_bits[field]
+            for k in range(lanes):
+                masks[i, k] = (mask >> (64 * k)) & 0xFFFFFFFFFFFFFFFF
+        return int(kernel(masks))
+
+    if np is not None and n >= MATRIX_MIN_METHODS:
+        # methods x fields incidence matrix; (M @ M.T)[i, j] is the number of fields
+        # methods i and j share. float32 keeps the product on BLAS and exact for these sizes.
+        field_bits = _field_index(field_sets)
+        rows = [i for i, fields in enumerate(field_sets) for _ in fields]
+        cols = [field_bits[field] for fields in field_sets for field in fields]
+        incidence = np.zeros((n, len(field_bits)), dtype=np.float32)
+        incidence[rows, cols] = 1
+        shared = incidence @ incidence.T
+        return int(np.count_nonzero(shared) - np.count_nonzero(np.diagonal(shared))) // 2
+
+    # Otherwise index each field to the methods touching it instead of comparing every pair
+    field_to_methods = defaultdict(list)
+    for i, fields in enumerate(field_sets):
+        for field in fields:
+            field_to_methods[field].append(i)
+    connected_pairs = set()
+    for indices in field_to_methods.values():
+        for a in range(len(indices)):
+            for b in range(a + 1, len(indices)):
+                connected_pairs.add((indices[a], indices[b]))
+    return len(connected_pairs)
+
+CACHE_DIR = ".class_metrics_cache"
+CACHE_FORMAT = 2  # bump whenever the extracted metrics change shape or meaning
+
+def _cache_path(file_path):
+    key = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, key + ".pickle")
+
+def _load_cache(file_path):
+    # Any entry that cannot be read back as a (signature, classes) pair, whether truncated,
+    # corrupt or written by another version of this script, is a miss and gets rewritten.
+    try:
+        with open(_cache_path(file_path), "rb") as f:
+            entry = pickle.load(f)
+    except Exception:
+        return None
+    if not (isinstance(entry, tuple) and len(entry) == 2 and isinstance(entry[1], list)):
+        return None
+    return entry
+
+def _save_cache(file_path, entry):
+    # One entry per source file, written atomically, so pool workers never share a cache file.
+    path = _cache_path(file_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
 def extract_class_metrics(file_path, repo_path):
+    # Unchanged files (same mtime and size) reuse the metrics of the previous run. The Python
+    # version is part of the key: a file this interpreter cannot parse is cached with no classes,
+    # and a newer one may parse it.
+    stat = os.stat(file_path)
+    signature = (CACHE_FORMAT, sys.version_info[:2], os.path.abspath(repo_path), stat.st_mtime, stat.st_size)
+    cached = _load_cache(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    rel_path = os.path.relpath(file_path, repo_path)
+
     with open(file_path, "r", encoding="utf-8") as f:
         code = f.read()
     try:
         tree = ast.parse(code)
     except SyntaxError:
+        _save_cache(file_path, (signature, []))
         return []
 
     class_metrics = []
+    scanner = _ClassScan()
 
     for node in ast.walk(tree):
         if isinstance(node, ast.ClassDef):
             methods = [n for n in node.body if isinstance(n, ast.FunctionDef)]
-            attributes = defaultdict(set)
+            scanner.scan(node)
+            attributes = scanner.attributes
 
-            for method in methods:
-                method_name = method.name
-                for subnode in ast.walk(method):
-                    if isinstance(subnode, ast.Attribute):
-                        if isinstance(subnode.value, ast.Name) and subnode.value.id == "self":
-                            attributes[method_name].add(subnode.attr)
-
-            # Calculate LCOM
+            # Calculate LCOM and TCC from the method pairs that share a field
             method_names = list(attributes.keys())
-            no_shared = 0
-            shared = 0
-            for i in range(len(method_names)):
-                for j in range(i + 1, len(method_names)):
-                    set_i = attributes[method_names[i]]
-                    set_j = attributes[method_names[j]]
-                    if set_i & set_j:
-                        shared += 1
-                    else:
-                        no_shared += 1
+            connected = count_connected_pairs([attributes[name] for name in method_names])
+            total = len(method_names) * (len(method_names) - 1) // 2
+            shared = connected
+            no_shared = total - connected
             lcom = no_shared - shared
             if lcom < 0:
                 lcom = 0
-
-            # Calculate TCC
-            connected = 0
-            total = 0
-            for i in range(len(method_names)):
-                for j in range(i + 1, len(method_names)):
-                    set_i = attributes[method_names[i]]
-                    set_j = attributes[method_names[j]]
-                    total += 1
-                    if set_i & set_j:
-                        connected += 1
             tcc = round(connected / total, 3) if total > 0 else 1.0
 
-            # Calculate CBO (coupling): count distinct class names used
-            imported_classes = set()
-            for subnode in ast.walk(node):
-                if isinstance(subnode, ast.Name) and subnode.id != node.name:
-                    imported_classes.add(subnode.id)
+            # CBO (coupling): distinct names used in the class, collected by the scanner
+            imported_classes = scanner.imported_classes
 
             class_metrics.append({
-                "filename": os.path.relpath(file_path, repo_path),
+                "filename": rel_path,
                 "class": node.name,
                 "loc": len(node.body),
                 "methods": len(methods),
@@ -119,88 +276,138 @@ def extract_class_metrics(file_path, repo_path):
                 "tcc": tcc,
                 "cbo": len(imported_classes),
             })
+    _save_cache(file_path, (signature, class_metrics))
     return class_metrics
 
-def get_class_git_stats(file_path, class_name, repo_path):
-    rel_path = os.path.relpath(file_path, repo_path)
-    try:
-        log_output = subprocess.check_output(
-            ["git", "log", "-L", f":class {class_name}:{rel_path}"],
-            stderr=subprocess.DEVNULL,
-            text=True,
-            cwd=repo_path
-        )
-    except subprocess.CalledProcessError:
-        return {
-            "changes": 0,
-            "lines_added": 0,
-            "lines_deleted": 0,
-            "authors": set(),
-            "nlc" : 0
-        }
+# Read-only git calls: skip optional index lock/refresh writes and locale setup on every fork.
+GIT_ENV = {**os.environ, "GIT_OPTIONAL_LOCKS": "0", "LC_ALL": "C"}
 
-    changes = log_output.count("commit")
+GIT_CACHE_SIZE = 1024  # classes whose git stats are kept for reuse
+
+def no_git_stats(class_name):
+    # Stats of a class without history, in the tuple shape get_class_git_stats returns.
+    return (class_name, 0, 0, 0, frozenset(), 0)
+
+@lru_cache(maxsize=GIT_CACHE_SIZE)
+def get_class_git_stats(rel_path, class_name, repo_path):
+    # One git log -L call per class. git merges adjacent ranges of a multi -L call into one
+    # hunk, so a combined call cannot be split back per class; the git thread pool overlaps
+    # these forks instead. Cached, so it returns an immutable
+    # (class, changes, lines_added, lines_deleted, authors, nlc) tuple.
+    # Only the commit and author headers are parsed, so ask for nothing else (no date or message).
+    cmd = ["git", "--no-pager", "log", "--format=commit %H%nAuthor: %aN <%aE>",
+           "-L", f":class {class_name}:{rel_path}"]
+    changes = 0
     lines_added = 0
     lines_deleted = 0
     authors = set()
+    in_diff = False
+    # Stream the log instead of buffering it: a long-lived class can have megabytes of history.
+    # stderr is discarded rather than piped: a pipe nobody reads while stdout is drained can
+    # fill up and block git and this thread forever.
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          text=True, cwd=repo_path, bufsize=1, env=GIT_ENV) as proc:
+        for line in proc.stdout:
+            if line.startswith("commit "):
+                changes += 1
+                in_diff = False
+            elif line.startswith("@@"):
+                in_diff = True
+            elif not in_diff:
+                if line.startswith("Author:"):
+                    authors.add(line.split(":", 1)[1].strip())
+            elif line.startswith("+") and not line.startswith("+++"):
+                lines_added += 1
+            elif line.startswith("-") and not line.startswith("---"):
+                lines_deleted += 1
+    if proc.returncode != 0:
+        return no_git_stats(class_name)
 
-    for line in log_output.splitlines():
-        if line.startswith("Author:"):
-            authors.add(line.split(":", 1)[1].strip())
-        elif line.startswith("+") and not line.startswith("+++"):
-            lines_added += 1
-        elif line.startswith("-") and not line.startswith("---"):
-            lines_deleted += 1
     total_lines_changed = lines_added + lines_deleted
     nlc = round(total_lines_changed / changes, 2) if changes > 0 else 0
+    return (class_name, changes, lines_added, lines_deleted, frozenset(authors), nlc)
 
-    return {
-        "changes": changes,
-        "lines_added": lines_added,
-        "lines_deleted": lines_deleted,
-        "authors": authors,
-        "nlc": nlc
-    }
-   
+DOT_NODE = re.compile(r'\s*"([^"]+)"\s*\[')
+DOT_EDGE = re.compile(r'"([^"]+)"\s*->\s*"([^"]+)"')
 
 def compute_fan_in_out(dot_file="classes.dot"):
     print("computing fan-in and fan-out using dot file: "+dot_file)
-    G = nx.drawing.nx_pydot.read_dot(dot_file)
+    # Only in/out degrees are needed, so read the node and edge lines of the pyreverse output directly.
+    # Repeated edges between the same two classes count once, as graph neighbours. Nodes keep the
+    # order networkx gave them (declarations in file order, then nodes only named by an edge), so
+    # when two classes share a short name the last one in that order wins, as before, and classes
+    # without edges still get their 0/0 entry.
+    nodes = {}
+    edges = {}
+    with open(dot_file, "r", encoding="utf-8") as f:
+        for line in f:
+            match = DOT_EDGE.search(line)
+            if match:
+                edges[match.groups()] = None
+                continue
+            match = DOT_NODE.match(line)
+            if match:
+                nodes[match.group(1)] = None
+    for edge in edges:
+        nodes.update(dict.fromkeys(edge))
+    fan_in = Counter(dst for _, dst in edges)
+    fan_out = Counter(src for src, _ in edges)
     fan_data = {}
-    for node in G.nodes:
-        clean_name = node.strip('"').split('.')[-1]
-        fan_in = len(list(G.predecessors(node)))
-        fan_out = len(list(G.successors(node)))
-        fan_data[clean_name] = {"fan_in": fan_in, "fan_out": fan_out}
+    for node in nodes:
+        clean_name = node.split('.')[-1]
+        fan_data[clean_name] = {"fan_in": fan_in[node], "fan_out": fan_out[node]}
     return fan_data
 
-def export_to_csv(results, fan_data, output_file):
-    #fieldnames = ["class", "filename", "loc", "methods", "lcom", "tcc", "cbo", "changes", "lines_added", "lines_deleted", "authors", "fan_in", "fan_out"]
-    fieldnames = ["class", "filename", "loc", "methods", "lcom", "tcc", "cbo", "changes", "lines_added", "lines_deleted", "nlc", "authors", "fan_in", "fan_out"]
-
-    with open(output_file, mode="w", newline='', encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in results:
-            fan_in = fan_data.get(r["class"], {}).get("fan_in", 0)
-            fan_out = fan_data.get(r["class"], {}).get("fan_out", 0)
-            writer.writerow({
-                "class": r["class"],
-                "filename": r["filename"],
-                "loc": r["loc"],
-                "methods": r["methods"],
-                "lcom": r["lcom"],
-                "tcc": r["tcc"],
-                "cbo": r["cbo"],
-                "changes": r["changes"],
-                "lines_added": r["lines_added"],
-                "lines_deleted": r["lines_deleted"],
-                "nlc": r["nlc"],
-                "authors": len(r["authors"]),
-                "fan_in": fan_in,
-                "fan_out": fan_out
-            })
-    print(f"\n📁 CSV export complete: {output_file}")
+CSV_FIELDNAMES = ["class", "filename", "loc", "methods", "lcom", "tcc", "cbo", "changes", "lines_added", "lines_deleted", "nlc", "authors", "fan_in", "fan_out"]
+
+# Same output as csv.writer: minimal quoting and "\r\n" row endings.
+CSV_ROW = ",".join(["{}"] * len(CSV_FIELDNAMES)) + "\r\n"
+
+def csv_text(value):
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def csv_row(r, fan_in, fan_out):
+    # Column count and types are fixed, so rows are formatted directly instead of going
+    # through the csv module; only the two text columns can ever need quoting.
+    return CSV_ROW.format(csv_text(r["class"]), csv_text(r["filename"]), r["loc"], r["methods"],
+                          r["lcom"], r["tcc"], r["cbo"], r["changes"], r["lines_added"],
+                          r["lines_deleted"], r["nlc"], len(r["authors"]), fan_in, fan_out)
+
+GIT_WORKERS = 8
+
+def get_tracked_files(repo_path):
+    # Paths relative to repo_path of every file git tracks; empty outside a git repository.
+    try:
+        output = subprocess.check_output(["git", "--no-pager", "ls-files", "-z"], cwd=repo_path,
+                                         stderr=subprocess.DEVNULL, text=True, env=GIT_ENV)
+    except (subprocess.CalledProcessError, OSError):
+        return set()
+    return set(output.split("\0")) - {""}
+
+def add_git_stats(classes, repo_path, tracked):
+    # Runs in a worker thread: nearly all of its time is spent waiting on git with the GIL released.
+    if not classes:
+        return []
+    rel_path = classes[0]["filename"]
+    if rel_path.replace(os.sep, "/") in tracked:
+        file_stats = [get_class_git_stats(rel_path, cls["class"], repo_path) for cls in classes]
+    else:
+        # Untracked files have no history: skip the git call, git log -L would fail anyway.
+        file_stats = [no_git_stats(cls["class"]) for cls in classes]
+    stats = {}
+    for name, changes, lines_added, lines_deleted, authors, nlc in file_stats:
+        stats[name] = {
+            "changes": changes,
+            "lines_added": lines_added,
+            "lines_deleted": lines_deleted,
+            "authors": authors,
+            "nlc": nlc
+        }
+    for cls in classes:
+        cls.update(stats[cls["class"]])
+    return classes
 
 def run_pyreverse(target_path, project_name):
     print(f"\n♻️ Running pyreverse on: {target_path}")
@@ -215,33 +422,59 @@ def main():
         print("Usage: python class_metrics_v5.py repo_path output_filename(with no extension)")
         sys.exit()
 
-    results = []
     files = get_py_files(repo_path)
-    print("Computing the first set of class metrics...")
-    for file_path in files:
-        classes = extract_class_metrics(file_path, repo_path)
-        for cls in classes:
-            stats = get_class_git_stats(file_path, cls["class"], repo_path)
-            cls.update(stats)
-            results.append(cls)
+    tracked = get_tracked_files(repo_path)
 
+    # Fan-in/out needs pyreverse over the whole repo, so it runs first and every class
+    # row can then be printed and written to the CSV as soon as its file is done.
     run_pyreverse(repo_path, repo_path)
     project_name = repo_path.replace("/", "_")
     dot_file_path = f"classes_{project_name}.dot"
     fan_data = compute_fan_in_out(dot_file_path)
+    fan_lookup = {name: (v["fan_in"], v["fan_out"]) for name, v in fan_data.items()}
 
+    print("Computing the first set of class metrics...")
     #print(f"{'Class':20} {'LOC':>5} {'Meth':>5} {'LCOM':>5} {'TCC':>5} {'CBO':>5} {'Chg':>5} {'+Lines':>7} {'-Lines':>7} {'Auth':>5} {'In':>4} {'Out':>4} Filename")
     print(f"{'Class':20} {'LOC':>5} {'Meth':>5} {'LCOM':>5} {'TCC':>5} {'CBO':>5} {'Chg':>5} {'+Lines':>7} {'-Lines':>7} {'NLC':>6} {'Auth':>5} {'In':>4} {'Out':>4} Filename")
 
 
     print("-" * 150)
-    for r in results:
-        fan_in = fan_data.get(r["class"], {}).get("fan_in", 0)
-        fan_out = fan_data.get(r["class"], {}).get("fan_out", 0)
-        print(f"{r['class']:20} {r['loc']:>5} {r['methods']:>5} {r['lcom']:>5} {r['tcc']:>5.2f} {r['cbo']:>5} {r['changes']:>5} {r['lines_added']:>7} {r['lines_deleted']:>7} {r['nlc']:>6.2f} {len(r['authors']):>5} {fan_in:>4} {fan_out:>4} {r['filename']}")
+    output_file = OUTPUT_FILE + ".csv"
+    with open(output_file, mode="w", newline='', encoding="utf-8", buffering=1 << 20) as csvfile:
+        csvfile.write(",".join(CSV_FIELDNAMES) + "\r\n")
+
+        def write_rows(classes):
+            for r in classes:
+                fan_in, fan_out = fan_lookup.get(r["class"], (0, 0))
+                csvfile.write(csv_row(r, fan_in, fan_out))
+                print(f"{r['class']:20} {r['loc']:>5} {r['methods']:>5} {r['lcom']:>5} {r['tcc']:>5.2f} {r['cbo']:>5} {r['changes']:>5} {r['lines_added']:>7} {r['lines_deleted']:>7} {r['nlc']:>6.2f} {len(r['authors']):>5} {fan_in:>4} {fan_out:>4} {r['filename']}")
 
+        # AST extraction is CPU-bound and runs in worker processes; the git stage only waits on
+        # subprocesses, so it runs in threads and starts on each file as soon as it is parsed.
+        # Rows are written in file order as soon as the oldest pending file is finished.
+        # Both stages keep only a small window of files in flight, so memory stays bounded
+        # however large the repository is.
+        workers = max(1, (os.cpu_count() or 2) - 1)
+        extract = partial(extract_class_metrics, repo_path=repo_path)
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                ThreadPoolExecutor(max_workers=GIT_WORKERS) as git_pool:
+            parsing = deque()
+            pending = deque()
 
-    export_to_csv(results, fan_data, OUTPUT_FILE + ".csv")
+            def start_git(classes):
+                pending.append(git_pool.submit(add_git_stats, classes, repo_path, tracked))
+                while pending and (len(pending) > 4 * GIT_WORKERS or pending[0].done()):
+                    write_rows(pending.popleft().result())
+
+            for path in files:
+                parsing.append(executor.submit(extract, path))
+                if len(parsing) > 4 * workers:
+                    start_git(parsing.popleft().result())
+            while parsing:
+                start_git(parsing.popleft().result())
+            while pending:
+                write_rows(pending.popleft().result())
+    print(f"\n📁 CSV export complete: {output_file}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,377 @@
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import class_metrics_v6 as cm
+
+# The script must report, for every class, what a separate
+# "git log -L :class <name>:<file>" call reports for it.
+
+NAMES = ["Alpha", "Beta", "Gamma", "Delta", "Eps", "Zeta", "AlphaX", "Eta"]
+
+
+def git(repo, *args, author="Ann"):
+    subprocess.run(["git", "-c", f"user.name={author}", "-c", f"user.email={author.lower()}@example.com",
+                    *args], cwd=repo, check=True, capture_output=True)
+
+
+def commit(repo, files, author="Ann"):
+    for name, text in files.items():
+        with open(os.path.join(repo, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "--allow-empty", "-m", "change", author=author)
+
+
+def per_class_stats(repo, rel_path, name):
+    # (changes, lines_added, lines_deleted, authors) from one git log call for this class alone
+    try:
+        output = subprocess.check_output(["git", "log", "-L", f":class {name}:{rel_path}"],
+                                         cwd=repo, stderr=subprocess.DEVNULL, text=True)
+    except subprocess.CalledProcessError:
+        return 0, 0, 0, 0
+    changes = added = deleted = 0
+    authors = set()
+    for line in output.splitlines():
+        if line.startswith("commit "):
+            changes += 1
+        elif line.startswith("Author:"):
+            authors.add(line.split(":", 1)[1].strip())
+        elif line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            deleted += 1
+    return changes, added, deleted, len(authors)
+
+
+def render(items):
+    # items: ["class", name, [[method, [fields]]], nested class name or None] or ["def"/"var", name]
+    out = []
+    for item in items:
+        if item[0] == "class":
+            _, name, methods, nested = item
+            out.append(f"class {name}:")
+            for i, (method, fields) in enumerate(methods):
+                out.append(f"    def {method}(self):")
+                out += [f"        self.{field}" for field in fields] or ["        pass"]
+                if nested and i == 0:
+                    out += [f"    class {nested}:", "        pass"]
+        elif item[0] == "def":
+            out += [f"def {item[1]}():", "    return 1"]
+        else:
+            out.append(f"{item[1]} = 1")
+        out.append("")
+    return "\n".join(out) + "\n"
+
+
+def mutate(items, rnd):
+    # One random edit: add, delete, rename or edit a class, or add a module-level statement.
+    classes = [i for i, item in enumerate(items) if item[0] == "class"]
+    free = [name for name in NAMES if name not in {item[1] for item in items}]
+    op = rnd.choice(["add", "del", "ren", "edit", "edit", "edit", "meth", "other", "nest"])
+    if (op == "add" or not classes) and free:
+        items.insert(rnd.randrange(len(items) + 1), ["class", rnd.choice(free), [["f", ["a"]]], None])
+    elif op == "del" and len(classes) > 1:
+        del items[rnd.choice(classes)]
+    elif op == "ren" and free:
+        items[rnd.choice(classes)][1] = rnd.choice(free)
+    elif op == "edit":
+        fields = rnd.choice(items[rnd.choice(classes)][2])[1]
+        if fields and rnd.random() < 0.4:
+            fields.pop(rnd.randrange(len(fields)))
+        else:
+            fields.append(rnd.choice("xyzw"))
+    elif op == "meth":
+        items[rnd.choice(classes)][2].append([f"g{rnd.randrange(99)}", ["b"]])
+    elif op == "other":
+        items.insert(rnd.randrange(len(items) + 1), [rnd.choice(["def", "var"]), f"v{rnd.randrange(99)}"])
+    elif op == "nest":
+        items[rnd.choice(classes)][3] = rnd.choice(["Meta", "Inner", None])
+
+
+class GitStatsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        patcher = mock.patch.object(cm, "CACHE_DIR", os.path.join(self.tmp, "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.new_repo("repo")
+
+    def new_repo(self, name):
+        self.repo = os.path.join(self.tmp, name)
+        os.mkdir(self.repo)
+        git(self.repo, "init", "-q")
+
+    def script_stats(self):
+        cm.get_class_git_stats.cache_clear()
+        tracked = cm.get_tracked_files(self.repo)
+        classes = cm.extract_class_metrics(os.path.join(self.repo, "f.py"), self.repo)
+        cm.add_git_stats(classes, self.repo, tracked)
+        return {c["class"]: (c["changes"], c["lines_added"], c["lines_deleted"], len(c["authors"]))
+                for c in classes}
+
+    def assertMatchesPerClass(self):
+        stats = self.script_stats()
+        self.assertEqual(stats, {name: per_class_stats(self.repo, "f.py", name) for name in stats})
+        return stats
+
+    def test_random_histories(self):
+        for seed in range(30):
+            with self.subTest(seed=seed):
+                self.new_repo(f"seed{seed}")
+                rnd = random.Random(seed)
+                items = [["class", "Alpha", [["f", ["a"]]], None], ["class", "Beta", [["f", ["a"]]], None]]
+                for i in range(rnd.randint(2, 8)):
+                    for _ in range(rnd.randint(1, 2) if i else 0):
+                        mutate(items, rnd)
+                    commit(self.repo, {"f.py": render(items)}, author=rnd.choice(["Ann", "Bob", "Cy"]))
+                self.assertMatchesPerClass()
+
+    def test_method_added_and_removed_before_adjacent_class(self):
+        # git -L follows A's lines at HEAD back through history; the method came and went
+        # after them, so it never enters A's range. One call for A and B together merges
+        # both ranges into a single hunk that does show it.
+        start = "class A:\n    x = 1\n\nclass B:\n    y = 1\n"
+        commit(self.repo, {"f.py": start})
+        commit(self.repo, {"f.py": start.replace("\n\n", "\n\n    def tmp(self): return 2\n")}, author="Bob")
+        commit(self.repo, {"f.py": start}, author="Cy")
+        stats = self.assertMatchesPerClass()
+        self.assertEqual(stats["A"], (1, 3, 0, 1))
+
+    def test_header_rewritten_after_deleted_line(self):
+        commit(self.repo, {"f.py": "class Alpha:\n    x = 1\n\nclass Beta:\n    y = 1\n"})
+        commit(self.repo, {"f.py": "class Alpha:\n    x = 1\nclass Beta(Alpha):\n    y = 1\n"}, author="Bob")
+        self.assertMatchesPerClass()
+
+    def test_deleted_class(self):
+        commit(self.repo, {"f.py": "class A:\n    x = 1\nclass B:\n    y = 1\nclass C:\n    z = 1\n"})
+        commit(self.repo, {"f.py": "class A:\n    x = 1\nclass C:\n    z = 1\n"}, author="Bob")
+        self.assertMatchesPerClass()
+
+    def test_renamed_class(self):
+        commit(self.repo, {"f.py": "class A:\n    x = 1\nclass Old:\n    y = 1\n"})
+        commit(self.repo, {"f.py": "class A:\n    x = 1\nclass Old:\n    y = 2\n"}, author="Bob")
+        commit(self.repo, {"f.py": "class A:\n    x = 1\nclass New:\n    y = 2\n"})
+        self.assertMatchesPerClass()
+
+    def test_nested_classes(self):
+        commit(self.repo, {"f.py": "class A:\n    class Meta:\n        pass\nclass B:\n    pass\n"
+                                   "if True:\n    class C:\n        pass\n"})
+        stats = self.assertMatchesPerClass()
+        self.assertEqual((stats["Meta"], stats["C"]), ((0, 0, 0, 0), (0, 0, 0, 0)))
+
+    def test_commit_in_message_and_code(self):
+        # only the commit headers count as changes
+        commit(self.repo, {"f.py": "class A:\n    def commit(self):\n        self.commit()\n"})
+        self.assertEqual(self.script_stats()["A"], (1, 3, 0, 1))
+
+    def test_untracked_file(self):
+        commit(self.repo, {"g.py": "x = 1\n"})
+        with open(os.path.join(self.repo, "f.py"), "w", encoding="utf-8") as f:
+            f.write("class A:\n    x = 1\n")
+        classes = cm.extract_class_metrics(os.path.join(self.repo, "f.py"), self.repo)
+        with mock.patch.object(cm, "get_class_git_stats") as git_stats:
+            cm.add_git_stats(classes, self.repo, cm.get_tracked_files(self.repo))
+        git_stats.assert_not_called()
+        self.assertEqual((classes[0]["changes"], classes[0]["authors"]), (0, frozenset()))
+
+    def test_mailmap(self):
+        commit(self.repo, {".mailmap": "Ann <ann@example.com> <old@example.com>\n",
+                           "f.py": "class A:\n    x = 1\nclass B:\n    y = 1\n"})
+        commit(self.repo, {"f.py": "class A:\n    x = 2\nclass B:\n    y = 2\n"}, author="Old")
+        stats = self.assertMatchesPerClass()
+        self.assertEqual(stats["A"][3], 1)
+
+
+class GetPyFilesTest(unittest.TestCase):
+    def test_os_walk_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for sub in ["a", "b/x", "b/y", "c", "a/z"]:
+                os.makedirs(os.path.join(tmp, sub))
+                for name in ["m.py", "n.py"]:
+                    open(os.path.join(tmp, sub, name), "w").close()
+            open(os.path.join(tmp, "top.py"), "w").close()
+            expected = [os.path.join(root, name) for root, _, files in os.walk(tmp) for name in files]
+            self.assertEqual(cm.get_py_files(tmp), expected)
+
+
+class SourceFileTestCase(unittest.TestCase):
+    # extract_class_metrics on a f.py in a temporary directory, with its own metrics cache
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        patcher = mock.patch.object(cm, "CACHE_DIR", os.path.join(self.tmp, "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = os.path.join(self.tmp, "f.py")
+
+    def extract(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return {c["class"]: (c["loc"], c["methods"], c["lcom"], c["tcc"], c["cbo"])
+                for c in cm.extract_class_metrics(self.path, self.tmp)}
+
+
+class ExtractClassMetricsTest(SourceFileTestCase):
+    def test_long_expression_chain(self):
+        # the scan is iterative, like the baseline's ast.walk: no RecursionError on deep trees
+        chain = " + ".join(["'s'"] * 1000)
+        text = (f"class A:\n    def f(self):\n        return self.x + {chain} + Helper\n"
+                "    def g(self):\n        return self.x\n    def h(self):\n        return self.y\n")
+        # f-g share x; f-h and g-h share nothing: lcom = 2 - 1
+        self.assertEqual(self.extract(text), {"A": (3, 3, 1, 0.333, 2)})
+
+    def test_deep_trees_outside_methods(self):
+        # class-level statements and long attribute chains are deep trees too
+        chain = " + ".join(["1"] * 1000)
+        attributes = "self" + ".a" * 1000
+        text = (f"class A(Base):\n    size = {chain}\n    def f(self):\n        return {attributes}\n")
+        # CBO names: Base, size and self
+        self.assertEqual(self.extract(text), {"A": (2, 1, 0, 1.0, 3)})
+
+    def test_scanner_state_is_reset_per_class(self):
+        # one scanner serves every class of the file
+        text = ("class A:\n    def f(self):\n        return self.x + One\n    def g(self):\n        return self.x\n"
+                "class B:\n    def f(self):\n        return self.y\n    def g(self):\n        return self.z\n")
+        self.assertEqual(self.extract(text), {"A": (2, 2, 0, 1.0, 2), "B": (2, 2, 1, 0.0, 1)})
+
+
+class MetricsCacheTest(SourceFileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.extract("class A:\n    def f(self):\n        return self.x\n")
+
+    def parsed(self):
+        # whether extract_class_metrics has to parse the file (a cache miss)
+        with mock.patch.object(cm.ast, "parse", wraps=cm.ast.parse) as parse:
+            classes = cm.extract_class_metrics(self.path, self.tmp)
+        self.assertEqual([c["class"] for c in classes], ["A"])
+        return parse.called
+
+    def test_hit(self):
+        self.assertFalse(self.parsed())
+
+    def test_mtime_change(self):
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertTrue(self.parsed())
+        self.assertFalse(self.parsed())
+
+    def test_size_change(self):
+        stat = os.stat(self.path)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("x = 1\n")
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertTrue(self.parsed())
+
+    def test_format_bump(self):
+        with mock.patch.object(cm, "CACHE_FORMAT", cm.CACHE_FORMAT + 1):
+            self.assertTrue(self.parsed())
+            self.assertFalse(self.parsed())
+
+    def test_corrupt_entry(self):
+        cache_path = cm._cache_path(self.path)
+        with open(cache_path, "rb") as f:
+            entry = f.read()
+        for broken in [entry[:len(entry) // 2], b"not a pickle", b""]:
+            with self.subTest(broken=broken[:12]):
+                with open(cache_path, "wb") as f:
+                    f.write(broken)
+                self.assertTrue(self.parsed())
+                # rewritten by the miss
+                self.assertFalse(self.parsed())
+
+
+def brute_force_pairs(field_sets):
+    return sum(bool(a & b) for i, a in enumerate(field_sets) for b in field_sets[i + 1:])
+
+
+def random_field_sets(rnd, methods, fields):
+    # the first method touches every field, so exactly `fields` distinct fields are in use
+    names = [f"f{i}" for i in range(fields)]
+    rest = [set(rnd.sample(names, rnd.randint(0, min(3, fields)))) for _ in range(methods - 1)]
+    return [set(names)] + rest if methods else []
+
+
+class ConnectedPairsTest(unittest.TestCase):
+    # Every path of count_connected_pairs must agree with the set-intersection definition.
+
+    def assertPathMatches(self, methods):
+        rnd = random.Random(methods)
+        for fields in [1, 5, 63, 64, 65, 130]:
+            for _ in range(5):
+                field_sets = random_field_sets(rnd, methods, fields)
+                with self.subTest(methods=methods, fields=fields):
+                    self.assertEqual(cm.count_connected_pairs(field_sets), brute_force_pairs(field_sets))
+
+    def test_python(self):
+        with mock.patch.object(cm, "np", None):
+            for methods in [0, 1, 2, 8, 40]:
+                self.assertPathMatches(methods)
+
+    @unittest.skipUnless(cm.np is not None, "numpy is not installed")
+    def test_numpy(self):
+        with mock.patch.object(cm, "_masks_kernel", False):
+            for methods in [cm.MATRIX_MIN_METHODS, 20, 40]:
+                self.assertPathMatches(methods)
+
+    @unittest.skipUnless(cm.np is not None and importlib.util.find_spec("numba"), "numpy or numba is not installed")
+    def test_numba(self):
+        for methods in [cm.JIT_MIN_METHODS, 40, 70]:
+            self.assertPathMatches(methods)
+        self.assertTrue(cm._masks_kernel)
+
+    def test_numba_is_imported_lazily(self):
+        code = "import sys, class_metrics_v6 as cm; cm.count_connected_pairs([{'a'}] * 3); print('numba' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=os.path.dirname(cm.__file__), text=True)
+        self.assertEqual(output.strip(), "False")
+
+
+# pyreverse -o dot output, trimmed to the lines compute_fan_in_out reads
+CLASSES_DOT = """digraph "classes_proj" {
+rankdir=BT
+charset="utf-8"
+"proj.a.Base" [color="black", fontcolor="black", label=<{Base|name : str<br ALIGN="LEFT"/>|run() -&gt; int<br ALIGN="LEFT"/>}>, shape="record", style="solid"];
+"proj.a.Child" [color="black", fontcolor="black", label=<{Child|base<br ALIGN="LEFT"/>|}>, shape="record", style="solid"];
+"proj.a.Lonely" [color="black", fontcolor="black", label=<{Lonely||}>, shape="record", style="solid"];
+"proj.b.Base" [color="black", fontcolor="black", label=<{Base||}>, shape="record", style="solid"];
+"proj.b.Other" [color="black", fontcolor="black", label=<{Other||}>, shape="record", style="solid"];
+"proj.a.Child" -> "proj.a.Base" [arrowhead="empty", arrowtail="none"];
+"proj.a.Child" -> "proj.a.Base" [arrowhead="diamond", arrowtail="none", fontcolor="green", label="base", style="solid"];
+"proj.b.Other" -> "proj.a.Base" [arrowhead="empty", arrowtail="none"];
+"proj.b.Other" -> "proj.b.Base" [arrowhead="diamond", arrowtail="none", fontcolor="green", label="other", style="solid"];
+}
+"""
+
+
+class FanInOutTest(unittest.TestCase):
+    def test_pyreverse_dot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dot_file = os.path.join(tmp, "classes_proj.dot")
+            with open(dot_file, "w", encoding="utf-8") as f:
+                f.write(CLASSES_DOT)
+            with contextlib.redirect_stdout(io.StringIO()):
+                fan_data = cm.compute_fan_in_out(dot_file)
+        self.assertEqual({name: (v["fan_in"], v["fan_out"]) for name, v in fan_data.items()}, {
+            # proj.a.Base has fan-in 2, but proj.b.Base is declared later and wins the short name
+            "Base": (1, 0),
+            # the inheritance and the association edge to proj.a.Base count once
+            "Child": (0, 1),
+            # declared without edges
+            "Lonely": (0, 0),
+            "Other": (0, 2),
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()